@@ -0,0 +1,42 @@
+import json
+from typing import Any, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup (pip install "ai-cost-calculator[fast]")
+    orjson = None
+
+# Stdlib fallback encoders, built once. json.dumps() creates a new JSONEncoder on
+# every call unless all arguments are defaults (ensure_ascii=False is not).
+# json.loads() without arguments already reuses a module-level decoder.
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+_encode_indent = json.JSONEncoder(ensure_ascii=False, indent=2).encode
+
+
+# Parse JSON text, using orjson when available. Returns (obj, finite): finite is
+# True when orjson parsed it, which means it holds no NaN/Infinity (orjson rejects
+# them, only the stdlib fallback accepts them).
+def loads(raw: Union[str, bytes]) -> Tuple[Any, bool]:
+    if orjson is not None:
+        try:
+            return orjson.loads(raw), True
+        except orjson.JSONDecodeError:
+            # stdlib is more lenient (NaN/Infinity) and raises the usual error otherwise
+            pass
+    return json.loads(raw), False
+
+
+# Serialize to JSON text (non-ASCII kept as-is). orjson is only used when the caller
+# knows obj holds no NaN/Infinity (finite=True): orjson writes those as null, while
+# the stdlib round-trips them.
+def dumps(obj: Any, *, indent: bool = False, finite: bool = False) -> str:
+    if finite and orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option).decode("utf-8")
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits; let stdlib handle (or reject) them
+            pass
+    return _encode_indent(obj) if indent else _encode(obj)
@@ -0,0 +1,83 @@
+"""
+Batch cost kernels over int64 token arrays (requires NumPy).
+
+Amounts are returned in 1e-8 USD, rounded ROUND_HALF_UP: the int numerator
+(tokens x scaled prices) divided by `unit`, the pricing kernel's divisor
+(calculator._OpenAIKernel.div / _GeminiKernel.div). When Numba is installed
+the loops are JIT-compiled (eagerly, at import) and run in parallel; otherwise
+the NumPy expressions are used.
+Callers must make sure the numerators fit in int64 and are non-negative.
+"""
+try:
+    import numpy as np
+except ImportError:  # optional: pip install "ai-cost-calculator[batch]"
+    np = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # optional: pip install "ai-cost-calculator[jit]"
+    njit = None
+    prange = range
+
+
+# ----------------------------
+# NumPy versions
+# ----------------------------
+
+# Exact ROUND_HALF_UP of num / unit for non-negative int64 numerators
+def _round_half_up_div(num, unit):
+    q, r = np.divmod(num, unit)
+    return q + (2 * r >= unit)
+
+def _openai_amounts_np(inp, out, cached, input_s, cached_s, output_s, unit):
+    billable = np.maximum(inp - cached, 0)
+    num = billable * input_s + cached * cached_s + out * output_s
+    return _round_half_up_div(num, unit)
+
+# Per-row price arrays (already gathered by tier); storage_num is in 1e-8 USD x unit
+def _gemini_amounts_np(inp, out, cached, storage_num, input_s, cache_s, output_s, unit):
+    billable = np.maximum(inp - cached, 0)
+    num = billable * input_s + cached * cache_s + out * output_s + storage_num
+    return _round_half_up_div(num, unit)
+
+
+# ----------------------------
+# Numba versions (no cross-row dependency -> prange)
+# ----------------------------
+
+def _openai_amounts_loop(inp, out, cached, input_s, cached_s, output_s, unit):
+    n = inp.shape[0]
+    res = np.empty(n, dtype=np.int64)
+    for j in prange(n):
+        billable = inp[j] - cached[j]
+        if billable < 0:
+            billable = 0
+        num = billable * input_s + cached[j] * cached_s + out[j] * output_s
+        q = num // unit
+        res[j] = q + 1 if 2 * (num - q * unit) >= unit else q
+    return res
+
+def _gemini_amounts_loop(inp, out, cached, storage_num, input_s, cache_s, output_s, unit):
+    n = inp.shape[0]
+    res = np.empty(n, dtype=np.int64)
+    for j in prange(n):
+        billable = inp[j] - cached[j]
+        if billable < 0:
+            billable = 0
+        num = billable * input_s[j] + cached[j] * cache_s[j] + out[j] * output_s[j] + storage_num[j]
+        q = num // unit
+        res[j] = q + 1 if 2 * (num - q * unit) >= unit else q
+    return res
+
+
+# Explicit signatures compile the kernels eagerly at import (or load them from the
+# on-disk cache), so the first large batch does not pay the JIT warmup
+_OPENAI_SIG = "int64[:](int64[:], int64[:], int64[:], int64, int64, int64, int64)"
+_GEMINI_SIG = "int64[:](int64[:], int64[:], int64[:], int64[:], int64[:], int64[:], int64[:], int64)"
+
+if njit is not None and np is not None:
+    openai_amounts = njit(_OPENAI_SIG, parallel=True, cache=True)(_openai_amounts_loop)
+    gemini_amounts = njit(_GEMINI_SIG, parallel=True, cache=True)(_gemini_amounts_loop)
+else:
+    openai_amounts = _openai_amounts_np
+    gemini_amounts = _gemini_amounts_np
@@ -1,12 +1,29 @@
-import json
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from string import Template
 from typing import Any, Dict, Optional, Tuple
 
+from ._json import dumps as _dumps
+
 class EmailSendError(RuntimeError):
     """Raised when the internal email API call fails."""
 
 
+# Shared HTTP session: keeps connections to the email API alive across sends
+# (one TLS handshake for a multi-recipient alert instead of one per recipient)
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Upper bound on concurrent alert sends (one per recipient)
+_MAX_SEND_WORKERS = 8
+
+
+# Env config does not change at runtime: read each variable once per process.
+# Tests (or apps that load .env late) can call _reset_env_cache().
+@lru_cache(maxsize=None)
 def _env(name: str, default: Optional[str] = None) -> Optional[str]:
     v = os.getenv(name)
     if v is None:
@@ -14,12 +31,17 @@ def _env(name: str, default: Optional[str] = None) -> Optional[str]:
     v = v.strip()
     return v if v else default
 
+@lru_cache(maxsize=None)
 def _env_bool(name: str, default: bool = False) -> bool:
     raw = _env(name)
     if raw is None:
         return default
     return raw.lower() in ("1", "true", "yes", "y", "on")
 
+def _reset_env_cache() -> None:
+    _env.cache_clear()
+    _env_bool.cache_clear()
+
 def _parse_email_list(raw: Optional[str]) -> list[str]:
     if not raw:
         return []
@@ -38,9 +60,11 @@ def send_internal_email_generic(
     timeout_s: float = 10.0,
     dry_run: bool = False,
     debug: bool = False,
+    session: Optional[requests.Session] = None,
 ) -> Dict[str, Any]:
     """
     Sends a 'generic' email via Nooko internal email API.
+    Uses the module's pooled session unless `session` is given.
 
     Dry-run mode:
       - Does NOT call the API
@@ -76,7 +100,7 @@ def send_internal_email_generic(
     if dry_run:
         if debug:
             print("[EMAIL][DRY_RUN] Would POST:", url)
-            print("[EMAIL][DRY_RUN] Payload:\n", json.dumps(payload, indent=2, ensure_ascii=False))
+            print("[EMAIL][DRY_RUN] Payload:\n", _dumps(payload, indent=True))
         return {
             "success": True,
             "dry_run": True,
@@ -95,7 +119,7 @@ def send_internal_email_generic(
         print("[EMAIL] Subject:", subject)
 
     try:
-        resp = requests.post(
+        resp = (session or _session).post(
             url,
             json=payload,
             headers={
@@ -115,6 +139,22 @@ def send_internal_email_generic(
     except Exception as e:
         raise EmailSendError(f"Email API returned non-JSON response: {resp.text[:300]}") from e
 
+# HTML body of the unknown-model alert (built once at import)
+_UNKNOWN_MODELS_BODY = Template(
+    "<p>Hello,</p>"
+    "<p>The <strong>AI Cost Calculator</strong> could not compute cost for one or more AI usage records because the model name "
+    "was not found in the pricing JSON.</p>"
+    "<p><strong>Action needed:</strong> Please add pricing (or an alias mapping) for the model(s) below so future transactions "
+    "can be priced correctly.</p>"
+    "<p><strong>Unknown model(s) detected:</strong></p>"
+    "<ul>${bullets}</ul>"
+    "<p><strong>Details (raw payload excerpt):</strong></p>"
+    "<pre style='background:#f6f8fa;padding:12px;border-radius:6px;overflow:auto;white-space:pre;'>"
+    "${pretty}"
+    "</pre>"
+    "<p>Thank you.</p>"
+)
+
 def build_unknown_models_email(*, models: list[Dict[str, Any]]) -> Tuple[str, str]:
     model_names = sorted({m.get("model") for m in models if isinstance(m, dict) and m.get("model")})
     bullets = "".join(f"<li><code>{name}</code></li>" for name in model_names)
@@ -122,26 +162,10 @@ def build_unknown_models_email(*, models: list[Dict[str, Any]]) -> Tuple[str, st
         f" (+{len(model_names) - 3} more)" if len(model_names) > 3 else ""
     )
 
-    raw_models = models
-    if isinstance(raw_models, str):
-        raw_models = json.loads(raw_models)
-
-    pretty = json.dumps(raw_models, indent=2, ensure_ascii=False)
-
-    body = (
-        "<p>Hello,</p>"
-        "<p>The <strong>AI Cost Calculator</strong> could not compute cost for one or more AI usage records because the model name "
-        "was not found in the pricing JSON.</p>"
-        "<p><strong>Action needed:</strong> Please add pricing (or an alias mapping) for the model(s) below so future transactions "
-        "can be priced correctly.</p>"
-        "<p><strong>Unknown model(s) detected:</strong></p>"
-        f"<ul>{bullets}</ul>"
-        "<p><strong>Details (raw payload excerpt):</strong></p>"
-        "<pre style='background:#f6f8fa;padding:12px;border-radius:6px;overflow:auto;white-space:pre;'>"
-        + pretty +
-        "</pre>"
-        "<p>Thank you.</p>"
-    )
+    # models is always the list built by estimate_cost (a JSON string is not accepted)
+    assert not isinstance(models, str), "models must be a list of dicts"
+
+    body = _UNKNOWN_MODELS_BODY.substitute(bullets=bullets, pretty=_dumps(models, indent=True))
 
     return subject, body
 
@@ -180,18 +204,18 @@ def notify_unknown_models_if_configured(
 
     subject, body = build_unknown_models_email(models=unknown_models)
 
-    any_sent = False
-    for to_email in recipients:
-        try:
-            # Token only needed if not dry-run
-            token = internal_token or _env("NOOKO_INTERNAL_TOKEN")
-
-            if (not dry_run) and (not token):
-                if debug:
-                    print("[EMAIL] Missing token and dry_run=False. Skipping send.")
-                continue
+    # Token only needed if not dry-run
+    token = internal_token or _env("NOOKO_INTERNAL_TOKEN")
+    if (not dry_run) and (not token):
+        if debug:
+            print("[EMAIL] Missing token and dry_run=False. Skipping send.")
+        return False
 
-            send_internal_email_generic(
+    # Recipients are independent: send concurrently (I/O-bound, one round-trip each)
+    with ThreadPoolExecutor(max_workers=min(_MAX_SEND_WORKERS, len(recipients))) as ex:
+        futures = {
+            ex.submit(
+                send_internal_email_generic,
                 to_email=to_email,
                 subject=subject,
                 body_html=body,
@@ -199,10 +223,16 @@ def notify_unknown_models_if_configured(
                 internal_token=token,
                 dry_run=bool(dry_run),
                 debug=bool(debug),
-            )
+            ): to_email
+            for to_email in recipients
+        }
+
+        any_sent = False
+        for future in as_completed(futures):
+            e = future.exception()
+            if e is not None:
+                print(f"Failed to send unknown models alert email to {futures[future]}: {e}")
+                continue
             any_sent = True
-        except Exception as e:
-            print(f"Failed to send unknown models alert email to {to_email}: {e}")
-            continue
 
     return any_sent
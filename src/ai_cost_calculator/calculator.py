@@ -1,7 +1,16 @@
-import json
+import math
+from array import array
+from bisect import bisect_left
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Union
 
+try:
+    import numpy as np
+except ImportError:  # optional: pip install "ai-cost-calculator[batch]"
+    np = None
+
+from . import _kernels
+from ._json import dumps as _dumps, loads as _loads
 from .pricing_loader import get_pricing
 from .alerts import notify_unknown_models_if_configured
 
@@ -11,6 +20,11 @@ from .alerts import notify_unknown_models_if_configured
 
 # Helper to convert to Decimal with default
 def d(x: Any, default: str = "0") -> Decimal:
+    # exact type checks first: the common int/Decimal inputs skip str() and the try
+    if type(x) is Decimal:
+        return x
+    if type(x) is int:
+        return Decimal(x)
     try:
         if x is None:
             return Decimal(default)
@@ -18,8 +32,39 @@ def d(x: Any, default: str = "0") -> Decimal:
     except Exception:
         return Decimal(default)
 
+# Helper to convert to float with default
+def fl(x: Any, default: float = 0.0) -> float:
+    if type(x) is float:
+        return x
+    try:
+        if x is None:
+            return default
+        return float(x)
+    except Exception:
+        return default
+
+# Output precision: amounts are formatted in units of 1e-8 USD
+PRICE_SCALE = 100_000_000
+
+# Prices are handled as exact integers over a power-of-ten scale shared by one
+# model's prices: price * scale, where scale is at least PRICE_SCALE and covers every
+# price's decimals (Decimal(str(x)), as d() parses them). Token x price products
+# stay exact ints whatever billing_unit_tokens is; each amount is turned into a
+# float by a single correctly rounded int division.
+# Returns (scale, [price * scale, ...]).
+def _scaled_prices(*prices: Any) -> Tuple[int, List[int]]:
+    values = [d(p) for p in prices]
+    exp = 8
+    for v in values:
+        if not v.is_finite():
+            raise ValueError(f"Invalid price: {v}")
+        exp = max(exp, -v.as_tuple().exponent)
+    return 10**exp, [int(v.scaleb(exp)) for v in values]
+
 # Helper to convert to int with default
 def i(x: Any, default: int = 0) -> int:
+    if type(x) is int:
+        return x
     try:
         if x is None:
             return default
@@ -27,11 +72,28 @@ def i(x: Any, default: int = 0) -> int:
     except Exception:
         return default
 
+_QUANTUM = Decimal("0.00000001")
+
 # Format Decimal as USD string with 8 decimal places
 def fmt_usd_8(amount: Decimal) -> str:
-    q = amount.quantize(Decimal("0.00000001"), rounding=ROUND_HALF_UP)
+    q = amount.quantize(_QUANTUM, rounding=ROUND_HALF_UP)
     return format(q, "f") 
 
+# Format an amount given in 1e-8 USD (non-negative int) with 8 decimal places
+def fmt_usd_8_from_scaled(amount: int) -> str:
+    q, r = divmod(amount, PRICE_SCALE)
+    return f"{q}.{r:08d}"
+
+# Format num / (div * PRICE_SCALE) USD with 8 decimal places, ROUND_HALF_UP.
+# Same result as fmt_usd_8(Decimal(num) / ...) using only int math.
+def fmt_usd_8_ratio(num: int, div: int) -> str:
+    if num < 0:
+        # only with negative token counts; half rounds away from zero and a
+        # tiny negative amount keeps its sign ("-0.00000000"), like Decimal
+        return "-" + fmt_usd_8_ratio(-num, div)
+    q, r = divmod(num, div)
+    return fmt_usd_8_from_scaled(q + 1 if 2 * r >= div else q)
+
 # Check if cost_usd is empty
 def is_empty_cost(v: Any) -> bool:
     return v is None or (isinstance(v, str) and v.strip() == "")
@@ -41,21 +103,32 @@ def is_empty_cost(v: Any) -> bool:
 # Mapping function (ONE place)
 # ----------------------------
 
-def get_usage_fields(usage: Dict[str, Any]) -> Dict[str, Any]:
-    model = str(usage.get("model") or "")
-    status = str(usage.get("status") or "")
-    input_tokens = i(usage.get("input_tokens"), 0)
-    output_tokens = i(usage.get("output_tokens"), 0)
-
-    cached_tokens = i(usage.get("cached_tokens"), 0)
+# Internal variant of get_usage_fields(): storage_hours is a float, as the
+# scaled-int pricing math expects
+def _usage_fields(usage: Dict[str, Any]) -> Dict[str, Any]:
+    get = usage.get
+    # model/status are nearly always str already: skip the str() call for those
+    v = get("model")
+    model = v if type(v) is str else str(v or "")
+    v = get("status")
+    status = v if type(v) is str else str(v or "")
+
+    # token counts are nearly always plain ints: skip the i() call for those
+    v = get("input_tokens")
+    input_tokens = v if type(v) is int else i(v, 0)
+    v = get("output_tokens")
+    output_tokens = v if type(v) is int else i(v, 0)
+    v = get("cached_tokens")
+    cached_tokens = v if type(v) is int else i(v, 0)
 
     # Fallback to input_token_details.cached_tokens if not present directly
-    if cached_tokens == 0:
-        details = usage.get("input_token_details")
+    if not cached_tokens:
+        details = get("input_token_details")
         if isinstance(details, dict):
             cached_tokens = i(details.get("cached_tokens"), 0)
 
-    storage_hours = d(usage.get("storage_hours"), "0")
+    v = get("storage_hours")
+    storage_hours = 0.0 if v is None else fl(v, 0.0)
 
     return {
         "model": model,
@@ -66,13 +139,18 @@ def get_usage_fields(usage: Dict[str, Any]) -> Dict[str, Any]:
         "storage_hours": storage_hours,
     }
 
+def get_usage_fields(usage: Dict[str, Any]) -> Dict[str, Any]:
+    fields = _usage_fields(usage)
+    fields["storage_hours"] = d(usage.get("storage_hours"), "0")
+    return fields
+
 
 # ----------------------------
 # Breakdown builders
 # ----------------------------
 
 # Line item builder for cost breakdown
-def li(name: str, quantity: Any, unit: str, unit_price: Decimal, cost: Decimal) -> Dict[str, Any]:
+def li(name: str, quantity: Any, unit: str, unit_price: float, cost: float) -> Dict[str, Any]:
     return {
         "name": name,
         "quantity": quantity,
@@ -90,7 +168,7 @@ def build_cost_payload(
     tokens: Dict[str, Any],
     pricing: Dict[str, Any],
     line_items: List[Dict[str, Any]],
-    total: Decimal,
+    total: float,
     meta: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     return {
@@ -109,65 +187,313 @@ def build_cost_payload(
 # Provider/model resolver
 # ----------------------------
 
+# Derived data per pricing dict (alias index, ...), keyed by id(pricing).
+# Each entry keeps a reference to its pricing dict, so the id cannot be reused while cached.
+_DERIVED_MAX = 8
+_derived_cache: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+def _derived(pricing: Dict[str, Any]) -> Dict[str, Any]:
+    entry = _derived_cache.get(id(pricing))
+    if entry is not None and entry[0] is pricing:
+        return entry[1]
+    if len(_derived_cache) >= _DERIVED_MAX:
+        _derived_cache.pop(next(iter(_derived_cache)))
+    derived: Dict[str, Any] = {}
+    _derived_cache[id(pricing)] = (pricing, derived)
+    return derived
+
+# Flat {model name or alias: (provider, key, cfg)}, built once per pricing dict.
+# Precedence matches the original scan: OpenAI keys, OpenAI aliases, Google keys, Google aliases.
+def _alias_index(pricing: Dict[str, Any]) -> Dict[str, Tuple[str, str, Dict[str, Any]]]:
+    derived = _derived(pricing)
+    index = derived.get("alias_index")
+    if index is not None:
+        return index
+
+    index = {}
+    for provider in ("openai", "google"):
+        models = (pricing.get(provider) or {}).get("models") or {}
+        if not isinstance(models, dict):
+            continue
+        for key, cfg in models.items():
+            index.setdefault(key, (provider, key, cfg))
+        for key, cfg in models.items():
+            for alias in (cfg or {}).get("aliases") or []:
+                index.setdefault(alias, (provider, key, cfg))
+
+    derived["alias_index"] = index
+    return index
+
+_UNRESOLVED: Tuple[None, None, None] = (None, None, None)
+
 def resolve_provider_model(pricing: Dict[str, Any], model_name: str) -> Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]]]:
-    # OpenAI (key + aliases)
-    openai_models = (pricing.get("openai") or {}).get("models") or {}
-    if isinstance(openai_models, dict):
-        if model_name in openai_models:
-            return "openai", model_name, openai_models[model_name]
-        for key, cfg in openai_models.items():
-            aliases = (cfg or {}).get("aliases") or []
-            if model_name in aliases:
-                return "openai", key, cfg
-
-    # Google (key + aliases if present)
-    google_models = (pricing.get("google") or {}).get("models") or {}
-    if isinstance(google_models, dict):
-        if model_name in google_models:
-            return "google", model_name, google_models[model_name]
-        for key, cfg in google_models.items():
-            aliases = (cfg or {}).get("aliases") or []
-            if model_name in aliases:
-                return "google", key, cfg
-
-    return None, None, None
+    return _alias_index(pricing).get(model_name, _UNRESOLVED)
 
 
 # ----------------------------
-# OpenAI estimator (reference style)
+# Per-model pricing kernels (parsed once per pricing dict)
 # ----------------------------
 
-def estimate_openai_cost(pricing: Dict[str, Any], model: str, usage: Dict[str, Any]) -> Dict[str, Any]:
-    provider, key, cfg = resolve_provider_model(pricing, model)
-    if provider != "openai" or not isinstance(cfg, dict):
-        raise ValueError(f"No pricing found for OpenAI model: {model}")
+class _OpenAIKernel(NamedTuple):
+    unit: int
+    # prices are *_s = price * scale; an amount num is num / div in 1e-8 USD
+    # (div = unit * scale / PRICE_SCALE)
+    scale: int
+    div: int
+    input_s: int
+    cached_s: int
+    output_s: int
+    has_cached: bool
+    # USD per token (price / unit), for the breakdown line items
+    input_unit_price: float
+    cached_unit_price: float
+    output_unit_price: float
+    pricing: Dict[str, Any]  # "pricing" section of the breakdown
+
+class _GeminiTierKernel(NamedTuple):
+    tier: Dict[str, Any]
+    max_input_tokens: Optional[int]
+    input_s: int
+    cache_s: int
+    output_s: int
+    storage_s: int
+    storage_price: float
+    # USD per token (price / unit), for the breakdown line items
+    input_unit_price: float
+    cache_unit_price: float
+    output_unit_price: float
+    pricing: Dict[str, Any]  # "pricing" section of the breakdown
+
+class _GeminiKernel(NamedTuple):
+    unit: int
+    # one scale for all tiers (see _OpenAIKernel)
+    scale: int
+    div: int
+    tiers: Tuple[_GeminiTierKernel, ...]
+    # Tiers that select_tier() can actually return before the final fallback, in
+    # order: their max_input_tokens (None -> inf, strictly ascending, for bisect)
+    # and their index in `tiers`. A tier whose limit is not above every earlier
+    # one is always shadowed by an earlier match, so it is left out.
+    tier_max: Tuple[float, ...]
+    tier_idx: Tuple[int, ...]
+
+# billing_unit_tokens per provider, read once per pricing dict
+def _billing_unit(pricing: Dict[str, Any], provider: str) -> int:
+    units = _derived(pricing).setdefault("units", {})
+    unit = units.get(provider)
+    if unit is None:
+        unit = units[provider] = i((pricing.get(provider) or {}).get("billing_unit_tokens"), 1_000_000)
+    return unit
+
+def _openai_kernel(pricing: Dict[str, Any], key: str, cfg: Dict[str, Any]) -> _OpenAIKernel:
+    kernels = _derived(pricing).setdefault("openai_kernels", {})
+    kernel = kernels.get(key)
+    if kernel is not None:
+        return kernel
+
+    input_price = fl(cfg.get("input"))
+    output_price = fl(cfg.get("output"))
+
+    cached_input_raw = cfg.get("cached_input", None)  # can be null
+    has_cached = cached_input_raw is not None
+    cached_price = fl(cached_input_raw) if has_cached else 0.0
+
+    unit = _billing_unit(pricing, "openai")
+    scale, (input_s, cached_s, output_s) = _scaled_prices(
+        cfg.get("input"), cached_input_raw if has_cached else None, cfg.get("output")
+    )
+    denom = unit * scale
+
+    kernel = _OpenAIKernel(
+        unit=unit,
+        scale=scale,
+        div=denom // PRICE_SCALE,
+        input_s=input_s,
+        cached_s=cached_s,
+        output_s=output_s,
+        has_cached=has_cached,
+        input_unit_price=input_s / denom,
+        cached_unit_price=cached_s / denom,
+        output_unit_price=output_s / denom,
+        pricing={
+            "input": input_price,
+            "cached_input": (cached_price if has_cached else None),
+            "output": output_price,
+        },
+    )
+    kernels[key] = kernel
+    return kernel
 
-    unit = i((pricing.get("openai") or {}).get("billing_unit_tokens"), 1_000_000)
+def _gemini_kernel(pricing: Dict[str, Any], key: str, cfg: Dict[str, Any]) -> _GeminiKernel:
+    kernels = _derived(pricing).setdefault("gemini_kernels", {})
+    kernel = kernels.get(key)
+    if kernel is not None:
+        return kernel
 
-    f = get_usage_fields(usage)
+    tiers = cfg.get("tiers") or []
+    if not tiers:
+        raise ValueError("No pricing tiers configured")
+
+    unit = _billing_unit(pricing, "google")
+    price_keys = ("input", "context_cache", "output", "storage_per_hour")
+    scale, scaled = _scaled_prices(*(tier.get(name) for tier in tiers for name in price_keys))
+    denom = unit * scale
+
+    tier_kernels = []
+    for n, tier in enumerate(tiers):
+        mx = tier.get("max_input_tokens")
+        input_price = fl(tier.get("input"))
+        output_price = fl(tier.get("output"))
+        cache_price = fl(tier.get("context_cache"))
+        storage_price = fl(tier.get("storage_per_hour"))
+        input_s, cache_s, output_s, storage_s = scaled[4 * n:4 * n + 4]
+        tier_kernels.append(_GeminiTierKernel(
+            tier=tier,
+            max_input_tokens=(None if mx is None else i(mx, 0)),
+            input_s=input_s,
+            cache_s=cache_s,
+            output_s=output_s,
+            storage_s=storage_s,
+            storage_price=storage_price,
+            input_unit_price=input_s / denom,
+            cache_unit_price=cache_s / denom,
+            output_unit_price=output_s / denom,
+            pricing={
+                "input": input_price,
+                "context_cache": cache_price,
+                "output": output_price,
+                "storage_per_hour": storage_price,
+            },
+        ))
+
+    tier_max: List[float] = []
+    tier_idx: List[int] = []
+    for idx, t in enumerate(tier_kernels):
+        mx = math.inf if t.max_input_tokens is None else t.max_input_tokens
+        if not tier_max or mx > tier_max[-1]:
+            tier_max.append(mx)
+            tier_idx.append(idx)
+
+    kernel = _GeminiKernel(
+        unit=unit,
+        scale=scale,
+        div=denom // PRICE_SCALE,
+        tiers=tuple(tier_kernels),
+        tier_max=tuple(tier_max),
+        tier_idx=tuple(tier_idx),
+    )
+    kernels[key] = kernel
+    return kernel
+
+# Parse every model's prices up front, once per pricing dict (get_pricing() is
+# lru_cached, so in practice once per pricing file). Models with a bad config are
+# skipped here and raise from their estimator as before.
+def _prepare_pricing(pricing: Dict[str, Any]) -> None:
+    derived = _derived(pricing)
+    if derived.get("prepared"):
+        return
+    for name, (provider, key, cfg) in _alias_index(pricing).items():
+        if name != key or not isinstance(cfg, dict):
+            continue
+        try:
+            if provider == "openai":
+                _openai_kernel(pricing, key, cfg)
+            else:
+                _gemini_kernel(pricing, key, cfg)
+        except Exception:
+            continue
+    derived["prepared"] = True
+
+
+# ----------------------------
+# Cost terms (shared by the breakdown estimators and the total-only paths)
+# ----------------------------
+
+# Each term is an exact int numerator: cost = num / (unit * scale) USD.
+# Only the final total is quantized (see estimate_cost).
+def _openai_terms(k: _OpenAIKernel, f: Dict[str, Any]) -> Tuple[int, int, int, int, int]:
+    effective_cached = f["cached_tokens"] if k.has_cached else 0
+    billable_input = max(f["input_tokens"] - effective_cached, 0)
+    return (
+        effective_cached,
+        billable_input,
+        billable_input * k.input_s,
+        effective_cached * k.cached_s,
+        f["output_tokens"] * k.output_s,
+    )
+
+# storage_hours as an exact fraction (numerator, power-of-ten denominator): the
+# decimal value d() would parse, so fractional hours are billed exactly
+def _exact_hours(hours: float) -> Tuple[int, int]:
+    if hours == int(hours):
+        return int(hours), 1
+    v = Decimal(repr(hours))
+    exp = -v.as_tuple().exponent
+    return int(v.scaleb(exp)), 10**exp
+
+# Token terms are over (unit * scale); storage_num is over (unit * scale * hours_scale),
+# the last value returned (1 without storage).
+def _gemini_terms(k: _GeminiKernel, f: Dict[str, Any]) -> Tuple[_GeminiTierKernel, int, int, int, int, int, int]:
     input_tokens = f["input_tokens"]
-    output_tokens = f["output_tokens"]
     cached_tokens = f["cached_tokens"]
+    storage_hours = f["storage_hours"]
+    if type(storage_hours) is not float:
+        # Decimal from get_usage_fields()
+        storage_hours = fl(storage_hours)
+    t = _select_tier_kernel(k, input_tokens)
 
-    input_price = d(cfg.get("input"), "0")
-    output_price = d(cfg.get("output"), "0")
+    billable_input = max(input_tokens - cached_tokens, 0)
+    # storage is billed per hour (not per token unit); hours may be fractional
+    if storage_hours:
+        hours_num, hours_scale = _exact_hours(storage_hours)
+        storage_num = hours_num * t.storage_s * k.unit
+    else:
+        hours_scale, storage_num = 1, 0
+    return (
+        t,
+        billable_input,
+        billable_input * t.input_s,
+        cached_tokens * t.cache_s,
+        f["output_tokens"] * t.output_s,
+        storage_num,
+        hours_scale,
+    )
 
-    cached_input_raw = cfg.get("cached_input", None)  # can be null
-    cached_price = d(cached_input_raw, "0") if cached_input_raw is not None else Decimal("0")
-    effective_cached = cached_tokens if cached_input_raw is not None else 0
 
-    billable_input = max(input_tokens - effective_cached, 0)
+# ----------------------------
+# OpenAI estimator (reference style)
+# ----------------------------
+
+def estimate_openai_cost(
+    pricing: Dict[str, Any],
+    model: str,
+    usage: Dict[str, Any],
+    *,
+    resolved: Optional[Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]]]] = None,
+    fields: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    # `resolved` / `fields` let callers that already ran resolve_provider_model() /
+    # get_usage_fields() for this row skip doing it again
+    provider, key, cfg = resolved or resolve_provider_model(pricing, model)
+    if provider != "openai" or not isinstance(cfg, dict):
+        raise ValueError(f"No pricing found for OpenAI model: {model}")
+
+    k = _openai_kernel(pricing, key, cfg)
+    unit = k.unit
+
+    f = fields or _usage_fields(usage)
+    input_tokens = f["input_tokens"]
+    output_tokens = f["output_tokens"]
 
-    input_cost = (Decimal(billable_input) / Decimal(unit)) * input_price
-    cached_cost = (Decimal(effective_cached) / Decimal(unit)) * cached_price
-    output_cost = (Decimal(output_tokens) / Decimal(unit)) * output_price
+    effective_cached, billable_input, input_num, cached_num, output_num = _openai_terms(k, f)
+    denom = unit * k.scale
 
-    total = input_cost + cached_cost + output_cost
+    total = (input_num + cached_num + output_num) / denom
 
     line_items = [
-        li("input_tokens_billable", billable_input, "tokens", (input_price / Decimal(unit)), input_cost),
-        li("input_tokens_cached", effective_cached, "tokens", (cached_price / Decimal(unit)), cached_cost),
-        li("output_tokens", output_tokens, "tokens", (output_price / Decimal(unit)), output_cost),
+        li("input_tokens_billable", billable_input, "tokens", k.input_unit_price, input_num / denom),
+        li("input_tokens_cached", effective_cached, "tokens", k.cached_unit_price, cached_num / denom),
+        li("output_tokens", output_tokens, "tokens", k.output_unit_price, output_num / denom),
     ]
 
     return build_cost_payload(
@@ -180,11 +506,7 @@ def estimate_openai_cost(pricing: Dict[str, Any], model: str, usage: Dict[str, A
             "billable_input": billable_input,
             "output": output_tokens,
         },
-        pricing={
-            "input": float(input_price),
-            "cached_input": (float(cached_price) if cached_input_raw is not None else None),
-            "output": float(output_price),
-        },
+        pricing=dict(k.pricing),
         line_items=line_items,
         total=total,
         meta={},
@@ -205,43 +527,49 @@ def select_tier(tiers: List[Dict[str, Any]], input_tokens: int) -> Dict[str, Any
             return tier
     return tiers[-1]
 
-def estimate_gemini_cost(pricing: Dict[str, Any], model: str, usage: Dict[str, Any]) -> Dict[str, Any]:
-    provider, key, cfg = resolve_provider_model(pricing, model)
+# Same rule as select_tier(), over a kernel's pre-parsed tiers:
+# first tier with max_input_tokens >= input_tokens; past the last one -> last tier
+def _select_tier_kernel(kernel: _GeminiKernel, input_tokens: int) -> _GeminiTierKernel:
+    idx = bisect_left(kernel.tier_max, input_tokens)
+    if idx < len(kernel.tier_idx):
+        return kernel.tiers[kernel.tier_idx[idx]]
+    return kernel.tiers[-1]
+
+def estimate_gemini_cost(
+    pricing: Dict[str, Any],
+    model: str,
+    usage: Dict[str, Any],
+    *,
+    resolved: Optional[Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]]]] = None,
+    fields: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    # `resolved` / `fields` let callers that already ran resolve_provider_model() /
+    # get_usage_fields() for this row skip doing it again
+    provider, key, cfg = resolved or resolve_provider_model(pricing, model)
     if provider != "google" or not isinstance(cfg, dict):
         raise ValueError(f"No pricing found for Gemini model: {model}")
 
-    unit = i((pricing.get("google") or {}).get("billing_unit_tokens"), 1_000_000)
+    k = _gemini_kernel(pricing, key, cfg)
+    unit = k.unit
 
-    f = get_usage_fields(usage)
+    f = fields or _usage_fields(usage)
     input_tokens = f["input_tokens"]
     output_tokens = f["output_tokens"]
     cached_tokens = f["cached_tokens"]
-    storage_hours = f["storage_hours"]
+    storage_hours = fl(f["storage_hours"])
 
-    tiers = cfg.get("tiers") or []
-    tier = select_tier(tiers, input_tokens)
+    t, billable_input, input_num, cache_num, output_num, storage_num, hours_scale = _gemini_terms(k, f)
+    denom = unit * k.scale
 
-    input_price = d(tier.get("input"), "0")
-    output_price = d(tier.get("output"), "0")
-    cache_price = d(tier.get("context_cache"), "0")
-    storage_price = d(tier.get("storage_per_hour"), "0")
-
-    billable_input = max(input_tokens - cached_tokens, 0)
-
-    input_cost = (Decimal(billable_input) / Decimal(unit)) * input_price
-    cache_cost = (Decimal(cached_tokens) / Decimal(unit)) * cache_price
-    output_cost = (Decimal(output_tokens) / Decimal(unit)) * output_price
-    storage_cost = storage_hours * storage_price
-
-    total = input_cost + cache_cost + output_cost + storage_cost
+    total = ((input_num + cache_num + output_num) * hours_scale + storage_num) / (denom * hours_scale)
 
     line_items = [
-        li("input_tokens_billable", billable_input, "tokens", (input_price / Decimal(unit)), input_cost),
-        li("context_cache_tokens", cached_tokens, "tokens", (cache_price / Decimal(unit)), cache_cost),
-        li("output_tokens", output_tokens, "tokens", (output_price / Decimal(unit)), output_cost),
+        li("input_tokens_billable", billable_input, "tokens", t.input_unit_price, input_num / denom),
+        li("context_cache_tokens", cached_tokens, "tokens", t.cache_unit_price, cache_num / denom),
+        li("output_tokens", output_tokens, "tokens", t.output_unit_price, output_num / denom),
     ]
     if storage_hours != 0:
-        line_items.append(li("storage_hours", float(storage_hours), "hours", storage_price, storage_cost))
+        line_items.append(li("storage_hours", storage_hours, "hours", t.storage_price, storage_num / (denom * hours_scale)))
 
     return build_cost_payload(
         provider="google",
@@ -252,96 +580,330 @@ def estimate_gemini_cost(pricing: Dict[str, Any], model: str, usage: Dict[str, A
             "cached": cached_tokens,
             "billable_input": billable_input,
             "output": output_tokens,
-            "storage_hours": float(storage_hours),
-        },
-        pricing={
-            "input": float(input_price),
-            "context_cache": float(cache_price),
-            "output": float(output_price),
-            "storage_per_hour": float(storage_price),
+            "storage_hours": storage_hours,
         },
+        pricing=dict(t.pricing),
         line_items=line_items,
         total=total,
-        meta={"tier": tier},
+        meta={"tier": dict(t.tier)},
     )
 
 
+# ----------------------------
+# Total-only fast paths (used by estimate_cost; no breakdown allocations)
+# ----------------------------
+
+# Both return (numerator, div): the cost is numerator / (div * PRICE_SCALE) USD.
+# `f` is the _usage_fields() dict the caller already built for the row.
+def _openai_total(pricing: Dict[str, Any], key: str, cfg: Dict[str, Any], f: Dict[str, Any]) -> Tuple[int, int]:
+    k = _openai_kernel(pricing, key, cfg)
+    _, _, input_num, cached_num, output_num = _openai_terms(k, f)
+    return input_num + cached_num + output_num, k.div
+
+def _gemini_total(pricing: Dict[str, Any], key: str, cfg: Dict[str, Any], f: Dict[str, Any]) -> Tuple[int, int]:
+    k = _gemini_kernel(pricing, key, cfg)
+    _, _, input_num, cache_num, output_num, storage_num, hours_scale = _gemini_terms(k, f)
+    if hours_scale == 1:
+        return input_num + cache_num + output_num + storage_num, k.div
+    return (input_num + cache_num + output_num) * hours_scale + storage_num, k.div * hours_scale
+
+
+# ----------------------------
+# Provider dispatch
+# ----------------------------
+
+# Full breakdown per provider
+_ESTIMATORS = {
+    "openai": estimate_openai_cost,
+    "google": estimate_gemini_cost,
+}
+
+# Total only (what estimate_cost needs per row)
+_TOTALS = {
+    "openai": _openai_total,
+    "google": _gemini_total,
+}
+
+
+# ----------------------------
+# Batched estimator (NumPy, optional)
+# ----------------------------
+
+# Lists at least this long are priced per (provider, model) group with NumPy
+# (and Numba-compiled kernels when numba is installed, see _kernels.py)
+BATCH_MIN_ROWS = 256
+# Smaller groups are cheaper to price per row than to set up NumPy arrays for
+BATCH_MIN_GROUP = 8
+_INT64_MAX = 2**63 - 1
+
+# Rows that share one resolved model, stored column-wise (SoA) for the kernels
+# Token columns are array('q') (contiguous int64), viewed by NumPy without a copy.
+class _BatchGroup:
+    __slots__ = ("cfg", "usages", "input_tokens", "output_tokens", "cached_tokens", "storage_hours", "per_row")
+
+    def __init__(self, cfg: Dict[str, Any]) -> None:
+        self.cfg = cfg
+        self.usages: List[Dict[str, Any]] = []
+        self.input_tokens = array("q")
+        self.output_tokens = array("q")
+        self.cached_tokens = array("q")
+        self.storage_hours = array("d")
+        self.per_row: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []  # (usage, fields), token counts outside int64
+
+    def add(self, usage: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        n = len(self.usages)
+        try:
+            self.input_tokens.append(fields["input_tokens"])
+            self.output_tokens.append(fields["output_tokens"])
+            self.cached_tokens.append(fields["cached_tokens"])
+        except OverflowError:
+            del self.input_tokens[n:], self.output_tokens[n:], self.cached_tokens[n:]
+            self.per_row.append((usage, fields))
+            return
+        self.storage_hours.append(fields["storage_hours"])
+        self.usages.append(usage)
+
+    # (usage, fields) for the columnar rows, for pricing them one by one
+    def rows(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        return [
+            (usage, {"input_tokens": inp, "output_tokens": out, "cached_tokens": cached, "storage_hours": hours})
+            for usage, inp, out, cached, hours in zip(
+                self.usages, self.input_tokens, self.output_tokens, self.cached_tokens, self.storage_hours
+            )
+        ]
+
+def _tokens(column: array) -> Any:
+    return np.frombuffer(column, dtype=np.int64)
+
+# True if sum(tokens * price) cannot overflow int64 and no token count or price is
+# negative (the kernels' divmod rounding assumes a non-negative numerator)
+def _fits_int64(terms: List[Tuple[Any, int]]) -> bool:
+    bound = 0
+    for arr, price_s in terms:
+        if price_s < 0:
+            return False
+        if arr.size and int(arr.min()) < 0:
+            return False
+        bound += (int(arr.max()) if arr.size else 0) * price_s
+    return bound <= _INT64_MAX
+
+def _openai_batch(pricing: Dict[str, Any], key: str, group: _BatchGroup) -> Optional[Any]:
+    k = _openai_kernel(pricing, key, group.cfg)
+
+    inp = _tokens(group.input_tokens)
+    out = _tokens(group.output_tokens)
+    cached = _tokens(group.cached_tokens) if k.has_cached else np.zeros(len(inp), dtype=np.int64)
+    if not _fits_int64([(inp, k.input_s), (cached, k.cached_s), (out, k.output_s)]):
+        return None
+
+    return _kernels.openai_amounts(inp, out, cached, k.input_s, k.cached_s, k.output_s, k.div)
+
+def _gemini_batch(pricing: Dict[str, Any], key: str, group: _BatchGroup) -> Optional[Any]:
+    k = _gemini_kernel(pricing, key, group.cfg)
+    tiers = k.tiers
+
+    inp = _tokens(group.input_tokens)
+    out = _tokens(group.output_tokens)
+    cached = _tokens(group.cached_tokens)
+    hours = np.frombuffer(group.storage_hours, dtype=np.float64)
+    # fractional hours are billed exactly by the per-row path (_exact_hours);
+    # whole hours become an int64 column here
+    if not (np.isfinite(hours).all() and (hours == np.floor(hours)).all()):
+        return None
+    if hours.size and float(np.abs(hours).max()) >= 2**53:
+        return None
+    hours_i = hours.astype(np.int64)
+
+    # Bucket rows into tiers: first tier whose max_input_tokens >= input_tokens (None = no limit)
+    maxes = np.array([min(mx, _INT64_MAX) for mx in k.tier_max], dtype=np.int64)
+    tier_of = np.array(k.tier_idx + (len(tiers) - 1,), dtype=np.intp)
+    idx = tier_of[np.searchsorted(maxes, inp, side="left")]
+
+    input_s = np.array([t.input_s for t in tiers], dtype=np.int64)[idx]
+    cache_s = np.array([t.cache_s for t in tiers], dtype=np.int64)[idx]
+    output_s = np.array([t.output_s for t in tiers], dtype=np.int64)[idx]
+    storage_s = np.array([t.storage_s for t in tiers], dtype=np.int64)[idx]
+
+    if any(min(t.input_s, t.cache_s, t.output_s, t.storage_s) < 0 for t in tiers):
+        return None
+    storage_unit_s = max(t.storage_s for t in tiers) * k.unit
+    if storage_unit_s > _INT64_MAX or not _fits_int64([
+        (inp, max(t.input_s for t in tiers)),
+        (cached, max(t.cache_s for t in tiers)),
+        (out, max(t.output_s for t in tiers)),
+        (hours_i, storage_unit_s),
+    ]):
+        return None
+
+    # same exact int product as _gemini_terms: hours * storage_s * unit
+    storage_num = hours_i * storage_s * k.unit
+    return _kernels.gemini_amounts(inp, out, cached, storage_num, input_s, cache_s, output_s, k.div)
+
+_BATCHES = {
+    "openai": _openai_batch,
+    "google": _gemini_batch,
+}
+
+# Price grouped rows in place; groups that cannot use int64 math fall back to the per-row path.
+# Returns True if any row was priced.
+def _estimate_groups_batched(pricing: Dict[str, Any], groups: Dict[Tuple[str, str], _BatchGroup]) -> bool:
+    mutated = False
+    for (provider, key), group in groups.items():
+        per_row = group.per_row
+        if 0 < len(group.usages) < BATCH_MIN_GROUP:
+            per_row = group.rows() + per_row
+        elif group.usages:
+            try:
+                amounts = _BATCHES[provider](pricing, key, group)
+            except Exception:
+                amounts = None
+
+            if amounts is None:
+                per_row = group.rows() + per_row
+            else:
+                # scatter the results back onto the original rows
+                for usage, amount in zip(group.usages, amounts.tolist()):
+                    usage["cost_usd"] = fmt_usd_8_from_scaled(amount)
+                mutated = True
+
+        total_fn = _TOTALS[provider]
+        for usage, fields in per_row:
+            try:
+                num, div = total_fn(pricing, key, group.cfg, fields)
+                usage["cost_usd"] = fmt_usd_8_ratio(num, div)
+                mutated = True
+            except Exception:
+                continue
+    return mutated
+
+
 # ----------------------------
 # Main entrypoint (payload-only)
 # ----------------------------
 
+# True if the record still needs a cost. The cost check comes first: re-running
+# over already-priced records costs one lookup per row.
+def _needs_cost(usage: Any, skip_non_success: bool) -> bool:
+    return (
+        isinstance(usage, dict)
+        and ((cost := usage.get("cost_usd")) is None or (isinstance(cost, str) and not cost.strip()))
+        and (not skip_non_success or usage.get("status") == "success")
+        and bool(usage.get("model"))
+    )
+
+# Price one record that needs a cost. Unknown models are recorded once each in
+# unknown_records (seen_unknown dedups); with `groups`, the row is queued for the batched pass instead.
+# Returns True if cost_usd was written.
+def _process_one(
+    usage: Dict[str, Any],
+    pricing: Dict[str, Any],
+    alias_index: Dict[str, Tuple[str, str, Dict[str, Any]]],
+    seen_unknown: Set[str],
+    unknown_records: List[Dict[str, Any]],
+    groups: Optional[Dict[Tuple[str, str], _BatchGroup]],
+    return_breakdown: bool,
+) -> bool:
+    fields = _usage_fields(usage)
+    model = fields["model"]
+
+    resolved = alias_index.get(model, _UNRESOLVED)
+    provider = resolved[0]
+    if provider is None:
+        # first record per unknown model only; repeats do not build the details
+        if model not in seen_unknown:
+            seen_unknown.add(model)
+            unknown_records.append({
+                "model": model,
+                "provider_guess": None,
+                "usage": {
+                    "timestamp": usage.get("timestamp"),
+                    "module": usage.get("module"),
+                    "status": usage.get("status"),
+                    "input_tokens": usage.get("input_tokens"),
+                    "output_tokens": usage.get("output_tokens"),
+                },
+            })
+        return False
+
+    total_fn = _TOTALS.get(provider)
+    if total_fn is None:
+        return False
+
+    if groups is not None:
+        group = groups.get((provider, resolved[1]))
+        if group is None:
+            group = groups[(provider, resolved[1])] = _BatchGroup(resolved[2])
+        group.add(usage, fields)
+        return False
+
+    try:
+        if return_breakdown:
+            breakdown = _ESTIMATORS[provider](pricing, model, usage, resolved=resolved, fields=fields)
+        num, div = total_fn(pricing, resolved[1], resolved[2], fields)
+        usage["cost_usd"] = fmt_usd_8_ratio(num, div)
+        if return_breakdown:
+            usage["cost_breakdown"] = breakdown
+    except Exception:
+        return False
+    return True
+
 def estimate_cost(
     payload: Union[str, Dict[str, Any]],
     *,
     pricing_path: Optional[str] = None,
     skip_non_success: bool = True,
     alert_unknown_models: bool = True,
+    return_breakdown: bool = False,
 ) -> Union[str, Dict[str, Any]]:
+    # return_breakdown=True also stores the estimator's full breakdown on each
+    # priced record under "cost_breakdown" (off by default: only the total is computed)
 
     is_str = isinstance(payload, str)
-    data = json.loads(payload) if is_str else payload
+    # finite: the parsed payload has no NaN/Infinity, so it may be written back by orjson
+    data, finite = _loads(payload) if is_str else (payload, False)
 
     if not isinstance(data, dict):
         return payload
 
     pricing = get_pricing(pricing_path)
+    _prepare_pricing(pricing)
     ai_usage = data.get("ai_usage")
 
+    seen_unknown: Set[str] = set()
+    unknown_records: List[Dict[str, Any]] = []
+    # resolve_provider_model() inlined: one dict lookup per row
+    alias_index = _alias_index(pricing)
+
     if isinstance(ai_usage, dict):
-        ai_usage_list = [ai_usage]
+        # Single record (the common per-request call): no filtering list, no batching
+        mutated = _needs_cost(ai_usage, skip_non_success) and _process_one(
+            ai_usage, pricing, alias_index, seen_unknown, unknown_records, None, return_breakdown
+        )
     elif isinstance(ai_usage, list):
-        ai_usage_list = ai_usage
-    else:
-        return payload
+        mutated = False  # string payloads are re-serialized only if a row was priced
 
-    unknown_models_map: Dict[str, Dict[str, Any]] = {}
+        # Large lists: collect rows per resolved model and price each group in one NumPy pass
+        groups: Optional[Dict[Tuple[str, str], _BatchGroup]] = None
+        if np is not None and not return_breakdown and len(ai_usage) >= BATCH_MIN_ROWS:
+            groups = {}
 
-    for usage in ai_usage_list:
-        if not isinstance(usage, dict):
-            continue
+        # Rows that still need a cost, filtered in one pass
+        work = [usage for usage in ai_usage if _needs_cost(usage, skip_non_success)]
 
-        if skip_non_success and usage.get("status") != "success":
-            continue
-
-        if not is_empty_cost(usage.get("cost_usd")):
-            continue
-
-        fields = get_usage_fields(usage)
-        model = fields["model"]
-        if not model:
-            continue
-
-        provider, _, _ = resolve_provider_model(pricing, model)
-        if provider is None:
-            unknown_models_map.setdefault(model, {
-                "model": model,
-                "provider_guess": None,
-                "usage": {
-                    "timestamp": usage.get("timestamp"),
-                    "module": usage.get("module"),
-                    "status": usage.get("status"),
-                    "input_tokens": usage.get("input_tokens"),
-                    "output_tokens": usage.get("output_tokens"),
-                },
-            })
-            continue
+        for usage in work:
+            if _process_one(usage, pricing, alias_index, seen_unknown, unknown_records, groups, return_breakdown):
+                mutated = True
 
-        try:
-            if provider == "openai":
-                breakdown = estimate_openai_cost(pricing, model, usage)
-            elif provider == "google":
-                breakdown = estimate_gemini_cost(pricing, model, usage)
-            else:
-                continue
+        if groups and _estimate_groups_batched(pricing, groups):
+            mutated = True
+    else:
+        return payload
 
-            usage["cost_usd"] = fmt_usd_8(d(breakdown["total"], "0"))
-        except Exception:
-            continue
-    
     # Once the unknown are populated, it will call the notifier with the list of the unknown models and their details
-    if alert_unknown_models and unknown_models_map:
-        notify_unknown_models_if_configured(
-            unknown_models=list(unknown_models_map.values())
-        )
+    if alert_unknown_models and unknown_records:
+        notify_unknown_models_if_configured(unknown_models=unknown_records)
 
-    return json.dumps(data, ensure_ascii=False) if is_str else data
+    if not is_str:
+        return data
+    # (breakdown floats are not checked, so payloads carrying them take the stdlib encoder)
+    return _dumps(data, finite=finite and not return_breakdown) if mutated else payload
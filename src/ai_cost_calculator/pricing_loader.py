@@ -1,16 +1,25 @@
 import json
 from functools import lru_cache
 from importlib import resources
+from pathlib import Path
 from typing import Any, Dict, Optional
 
 
+# pricing_path -> absolute path, so "p.json" and "./p.json" share one parsed copy
+@lru_cache(maxsize=32)
+def _resolve_path(pricing_path: str) -> str:
+    return str(Path(pricing_path).resolve())
+
 @lru_cache(maxsize=8)
-def get_pricing(pricing_path: Optional[str] = None) -> Dict[str, Any]:
-    if pricing_path:
-        with open(pricing_path, "r", encoding="utf-8") as f:
+def _load(resolved_path: Optional[str]) -> Dict[str, Any]:
+    if resolved_path:
+        with open(resolved_path, "r", encoding="utf-8") as f:
             return json.load(f)
 
     with resources.files("ai_cost_calculator").joinpath("data", "model_pricing.json").open(
         "r", encoding="utf-8"
     ) as f:
         return json.load(f)
+
+def get_pricing(pricing_path: Optional[str] = None) -> Dict[str, Any]:
+    return _load(_resolve_path(pricing_path) if pricing_path else None)
@@ -1,4 +1,5 @@
 import csv
+import json
 import sys
 import platform
 import datetime as dt
@@ -37,9 +38,28 @@ def pytest_addoption(parser):
     )
 
 
+CSV_COLUMNS = [
+    "run_id",
+    "run_started_at",
+    "cwd",
+    "python",
+    "platform",
+    "pytest_version",
+    "timestamp",
+    "nodeid",
+    "phase",
+    "status",
+    "duration_sec",
+    "file",
+    "line",
+    "markers",
+    "param",
+    "details",
+]
+
+
 @pytest.hookimpl(tryfirst=True)
 def pytest_configure(config):
-    config._csv_rows = []
     config._run_meta = {
         "run_id": dt.datetime.now().strftime("%Y%m%d_%H%M%S"),
         "run_started_at": _now_iso(),
@@ -49,6 +69,33 @@ def pytest_configure(config):
         "pytest_version": getattr(pytest, "__version__", ""),
     }
 
+    config._csv_fh = None
+    config._csv_writer = None
+
+
+# Open the report when the session starts and keep it open, writing rows as tests
+# finish (nothing buffered in memory; rows written so far survive a crashed run).
+# pytest_sessionstart does not run for --help/--version, so those leave an existing
+# report untouched, while every real run (even one that collects nothing) replaces it.
+def pytest_sessionstart(session):
+    config = session.config
+    report_path = Path(config.getoption("--csv-report")).resolve()
+    append = bool(config.getoption("--csv-append"))
+
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+
+    write_header = True
+    if append and report_path.exists() and report_path.stat().st_size > 0:
+        write_header = False
+
+    mode = "a" if append else "w"
+    config._csv_path = report_path
+    config._csv_fh = report_path.open(mode, newline="", encoding="utf-8")
+    config._csv_writer = csv.DictWriter(config._csv_fh, fieldnames=CSV_COLUMNS)
+    if write_header:
+        config._csv_writer.writeheader()
+        config._csv_fh.flush()
+
 
 @pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):
@@ -102,7 +149,7 @@ def pytest_runtest_makereport(item, call):
     except Exception:
         pass
 
-    item.config._csv_rows.append(
+    item.config._csv_writer.writerow(
         {
             # run meta
             **item.config._run_meta,
@@ -119,46 +166,65 @@ def pytest_runtest_makereport(item, call):
             "details": details,
         }
     )
+    item.config._csv_fh.flush()
 
 
 def pytest_sessionfinish(session, exitstatus):
     config = session.config
-    report_path = Path(config.getoption("--csv-report")).resolve()
-    append = bool(config.getoption("--csv-append"))
+    if getattr(config, "_csv_fh", None) is None:
+        return
 
-    report_path.parent.mkdir(parents=True, exist_ok=True)
+    tr = config.pluginmanager.get_plugin("terminalreporter")
+    if tr:
+        tr.write_line(f"CSV report written to: {config._csv_path}")
 
-    columns = [
-        "run_id",
-        "run_started_at",
-        "cwd",
-        "python",
-        "platform",
-        "pytest_version",
-        "timestamp",
-        "nodeid",
-        "phase",
-        "status",
-        "duration_sec",
-        "file",
-        "line",
-        "markers",
-        "param",
-        "details",
-    ]
 
-    write_header = True
-    if append and report_path.exists() and report_path.stat().st_size > 0:
-        write_header = False
+def pytest_unconfigure(config):
+    fh = getattr(config, "_csv_fh", None)
+    if fh is not None:
+        fh.close()
+        config._csv_fh = None
 
-    mode = "a" if append else "w"
-    with report_path.open(mode, newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=columns)
-        if write_header:
-            writer.writeheader()
-        for row in getattr(config, "_csv_rows", []):
-            writer.writerow(row)
 
-    tr = config.pluginmanager.get_plugin("terminalreporter")
-    if tr:
-        tr.write_line(f"CSV report written to: {report_path}")
+# -----------------------------
+# 3) Shared fixtures
+# -----------------------------
+@pytest.fixture()
+def write_pricing(tmp_path):
+    """
+    Writes a pricing dict to a JSON file and returns its path, so estimate_cost
+    goes through the real loader (pricing_path=...).
+    """
+    def write(pricing, name="model_pricing.json"):
+        path = tmp_path / name
+        path.write_text(json.dumps(pricing), encoding="utf-8")
+        return str(path)
+
+    return write
+
+
+@pytest.fixture()
+def pricing_path(write_pricing):
+    """Small OpenAI + Gemini (two tiers) pricing file."""
+    return write_pricing({
+        "openai": {
+            "billing_unit_tokens": 1_000_000,
+            "models": {
+                "gpt-5-mini": {"input": 0.25, "cached_input": 0.025, "output": 2.0, "aliases": []},
+                "gpt-5.2": {"input": 1.75, "cached_input": 0.175, "output": 14.0, "aliases": []},
+            },
+        },
+        "google": {
+            "billing_unit_tokens": 1_000_000,
+            "models": {
+                "gemini-2.5-pro": {
+                    "tiers": [
+                        {"max_input_tokens": 200000, "input": 1.25, "output": 10.0,
+                         "context_cache": 0.125, "storage_per_hour": 4.5},
+                        {"max_input_tokens": None, "input": 2.5, "output": 15.0,
+                         "context_cache": 0.25, "storage_per_hour": 4.5},
+                    ]
+                }
+            },
+        },
+    })
@@ -0,0 +1,106 @@
+import pytest
+
+from ai_cost_calculator import alerts
+
+
+UNKNOWN = [{"model": "mystery-model", "status": "success", "input_tokens": 10, "output_tokens": 5}]
+
+
+@pytest.fixture(autouse=True)
+def fresh_env(monkeypatch):
+    """
+    Start every test with an empty env cache and no alert config, and make sure
+    nothing reaches the real email API.
+    """
+    for name in ("NOOKO_ALERT_EMAIL_TO", "NOOKO_INTERNAL_TOKEN", "NOOKO_ALERT_EMAIL_DRY_RUN", "NOOKO_ALERT_EMAIL_DEBUG"):
+        monkeypatch.delenv(name, raising=False)
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("unexpected call to the email API")
+
+    monkeypatch.setattr(alerts._session, "post", no_network)
+    alerts._reset_env_cache()
+    yield
+    alerts._reset_env_cache()
+
+
+def test_env_is_read_once_until_reset(monkeypatch):
+    monkeypatch.setenv("NOOKO_ALERT_EMAIL_TO", "ops@example.com")
+    assert alerts.notify_unknown_models_if_configured(unknown_models=UNKNOWN, dry_run=True) is True
+
+    # later changes are not seen: the first value stays cached
+    monkeypatch.delenv("NOOKO_ALERT_EMAIL_TO")
+    assert alerts._env("NOOKO_ALERT_EMAIL_TO") == "ops@example.com"
+    assert alerts.notify_unknown_models_if_configured(unknown_models=UNKNOWN, dry_run=True) is True
+
+    alerts._reset_env_cache()
+    assert alerts._env("NOOKO_ALERT_EMAIL_TO") is None
+    assert alerts.notify_unknown_models_if_configured(unknown_models=UNKNOWN, dry_run=True) is False
+
+
+class StubResponse:
+    def __init__(self, ok):
+        self.ok = ok
+        self.status_code = 200 if ok else 503
+        self.text = "ok" if ok else "unavailable"
+
+    def json(self):
+        return {"success": True}
+
+
+class StubSession:
+    """Records every post; recipients in `failing` get an HTTP error."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.posted = []
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        self.posted.append(json["to_email"])
+        return StubResponse(json["to_email"] not in self.failing)
+
+
+def test_concurrent_send_succeeds_if_any_recipient_succeeds(monkeypatch):
+    session = StubSession(failing={"down@example.com"})
+    monkeypatch.setattr(alerts, "_session", session)
+
+    sent = alerts.notify_unknown_models_if_configured(
+        unknown_models=UNKNOWN,
+        to_emails="down@example.com; ops@example.com",
+        internal_token="token",
+        dry_run=False,
+    )
+
+    assert sent is True
+    assert sorted(session.posted) == ["down@example.com", "ops@example.com"]
+
+
+def test_concurrent_send_fails_if_every_recipient_fails(monkeypatch):
+    session = StubSession(failing={"a@example.com", "b@example.com"})
+    monkeypatch.setattr(alerts, "_session", session)
+
+    sent = alerts.notify_unknown_models_if_configured(
+        unknown_models=UNKNOWN, to_emails="a@example.com,b@example.com", internal_token="token", dry_run=False
+    )
+
+    assert sent is False
+    assert sorted(session.posted) == ["a@example.com", "b@example.com"]
+
+
+def test_send_uses_the_given_session():
+    session = StubSession()
+
+    result = alerts.send_internal_email_generic(
+        to_email="ops@example.com", subject="s", body_html="<p>b</p>", internal_token="token", session=session
+    )
+    assert result == {"success": True}
+    assert session.posted == ["ops@example.com"]
+
+    with pytest.raises(alerts.EmailSendError):
+        alerts.send_internal_email_generic(
+            to_email="ops@example.com",
+            subject="s",
+            body_html="<p>b</p>",
+            internal_token="token",
+            session=StubSession(failing={"ops@example.com"}),
+        )
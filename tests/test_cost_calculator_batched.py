@@ -0,0 +1,152 @@
+import copy
+import warnings
+
+import pytest
+
+from ai_cost_calculator import calculator as cc
+
+
+def make_rows(n):
+    models = ["gpt-5-mini", "gpt-5.2", "gemini-2.5-pro", "unknown-model"]
+    rows = []
+    for k in range(n):
+        rows.append({
+            "model": models[k % len(models)],
+            "status": "success" if k % 7 else "error",
+            "input_tokens": (k * 7919) % 400_000,
+            "output_tokens": (k * 104729) % 50_000,
+            "cached_tokens": (k * 31) % 5_000,
+            "storage_hours": 2.5 if k % 11 == 0 else 0,
+            "cost_usd": "0.5" if k % 13 == 0 else None,
+        })
+    return rows
+
+
+def batched_and_scalar(rows, pricing_path, monkeypatch):
+    """
+    Prices the same rows with NumPy (batched) and without it (row by row).
+    """
+    pytest.importorskip("numpy")
+    batched = cc.estimate_cost({"ai_usage": copy.deepcopy(rows)}, pricing_path=pricing_path, alert_unknown_models=False)
+
+    monkeypatch.setattr(cc, "np", None)
+    scalar = cc.estimate_cost({"ai_usage": copy.deepcopy(rows)}, pricing_path=pricing_path, alert_unknown_models=False)
+    return batched, scalar
+
+
+def test_batched_matches_row_by_row(pricing_path, monkeypatch):
+    batched, scalar = batched_and_scalar(make_rows(cc.BATCH_MIN_ROWS * 2), pricing_path, monkeypatch)
+
+    assert batched == scalar
+
+
+def test_batched_rounds_half_up(pricing_path):
+    pytest.importorskip("numpy")
+    # 1 cached token on gpt-5-mini = 0.025 / 1M = 0.000000025 -> "0.00000003"
+    rows = [
+        {
+            "model": "gpt-5-mini",
+            "status": "success",
+            "input_tokens": 1,
+            "cached_tokens": 1,
+            "output_tokens": 0,
+            "cost_usd": None,
+        }
+        for _ in range(cc.BATCH_MIN_ROWS)
+    ]
+
+    out = cc.estimate_cost({"ai_usage": rows}, pricing_path=pricing_path, alert_unknown_models=False)
+    assert {u["cost_usd"] for u in out["ai_usage"]} == {"0.00000003"}
+
+
+def test_return_breakdown_adds_cost_breakdown(pricing_path):
+    rows = make_rows(cc.BATCH_MIN_ROWS)
+
+    out = cc.estimate_cost(
+        {"ai_usage": copy.deepcopy(rows)},
+        pricing_path=pricing_path,
+        alert_unknown_models=False,
+        return_breakdown=True,
+    )
+    plain = cc.estimate_cost({"ai_usage": copy.deepcopy(rows)}, pricing_path=pricing_path, alert_unknown_models=False)
+
+    priced = [u for u in out["ai_usage"] if "cost_breakdown" in u]
+    assert priced
+    for u in priced:
+        assert u["cost_breakdown"]["total"] == pytest.approx(float(u["cost_usd"]), abs=1e-8)
+    assert [u["cost_usd"] for u in out["ai_usage"]] == [u["cost_usd"] for u in plain["ai_usage"]]
+    assert not any("cost_breakdown" in u for u in plain["ai_usage"])
+
+
+def test_batched_negative_prices_match_row_by_row(write_pricing, monkeypatch):
+    path = write_pricing({
+        "openai": {"models": {"gpt-neg": {"input": -0.25, "cached_input": 0.025, "output": 2.0}}},
+        "google": {
+            "models": {
+                "gemini-neg": {
+                    "tiers": [
+                        {"max_input_tokens": 200000, "input": 1.25, "output": -10.0,
+                         "context_cache": 0.125, "storage_per_hour": 4.5},
+                        {"max_input_tokens": None, "input": 2.5, "output": 15.0,
+                         "context_cache": 0.25, "storage_per_hour": 4.5},
+                    ]
+                }
+            }
+        },
+    })
+    rows = [
+        {"model": "gpt-neg" if k % 2 else "gemini-neg", "status": "success",
+         "input_tokens": 3, "output_tokens": k % 5, "cost_usd": None}
+        for k in range(cc.BATCH_MIN_ROWS + 44)
+    ]
+
+    batched, scalar = batched_and_scalar(rows, path, monkeypatch)
+
+    assert batched == scalar
+    assert batched["ai_usage"][1]["cost_usd"] == "0.00000125"  # 3 * -0.25/1M + 1 * 2/1M
+
+
+@pytest.mark.parametrize(
+    "limits",
+    [
+        [200000, None],
+        [300000, 200000, None],
+        [None, 200000],
+        [200000, 200000, None],
+        [100, 300000, 200000],
+    ],
+)
+def test_batched_tier_selection_matches_row_by_row(limits, write_pricing, monkeypatch):
+    # distinct prices per tier, in file order (select_tier is first-match)
+    tiers = [
+        {"max_input_tokens": mx, "input": 1.0 + k, "output": 10.0 + k,
+         "context_cache": 0.1 * (k + 1), "storage_per_hour": 4.5}
+        for k, mx in enumerate(limits)
+    ]
+    path = write_pricing({"google": {"billing_unit_tokens": 1_000_000, "models": {"gemini-x": {"tiers": tiers}}}})
+
+    sizes = sorted({0, 10_000_000} | {n + d for n in limits if n is not None for d in (-1, 0, 1)})
+    rows = [
+        {"model": "gemini-x", "status": "success", "input_tokens": sizes[k % len(sizes)],
+         "output_tokens": 7, "cost_usd": None}
+        for k in range(cc.BATCH_MIN_ROWS)
+    ]
+
+    batched, scalar = batched_and_scalar(rows, path, monkeypatch)
+
+    assert batched == scalar
+
+
+def test_batched_huge_storage_hours_fall_back_without_warnings(pricing_path, monkeypatch):
+    rows = [
+        {"model": "gemini-2.5-pro", "status": "success", "input_tokens": 1000, "output_tokens": 10,
+         "storage_hours": 1e300 if k == 3 else k % 4, "cost_usd": None}
+        for k in range(cc.BATCH_MIN_ROWS)
+    ]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        batched, scalar = batched_and_scalar(rows, pricing_path, monkeypatch)
+
+    assert batched == scalar
+    assert len(batched["ai_usage"][3]["cost_usd"].split(".")[0]) == 301  # ~4.5e300 USD, priced exactly
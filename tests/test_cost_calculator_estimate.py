@@ -0,0 +1,154 @@
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+from ai_cost_calculator import calculator as cc, pricing_loader
+
+
+def test_prices_with_more_than_8_decimals_are_exact(write_pricing):
+    # per-token pricing (billing_unit_tokens=1) needs more than 8 decimals
+    path = write_pricing({
+        "openai": {
+            "billing_unit_tokens": 1,
+            "models": {"gpt-tiny": {"input": 0.000000125, "cached_input": None, "output": 0.0000004}},
+        },
+        "google": {
+            "billing_unit_tokens": 1000,
+            "models": {
+                "gemini-tiny": {
+                    "tiers": [{"max_input_tokens": None, "input": 0.0001234567891, "output": 0,
+                               "context_cache": 0, "storage_per_hour": 0.000000015}]
+                }
+            },
+        },
+    })
+    row = {"status": "success", "input_tokens": 1_000_000, "output_tokens": 0, "cost_usd": None}
+
+    out = cc.estimate_cost(
+        {"ai_usage": [dict(row, model="gpt-tiny"), dict(row, model="gemini-tiny", storage_hours=1.5)]},
+        pricing_path=path,
+        alert_unknown_models=False,
+        return_breakdown=True,
+    )
+    openai_row, gemini_row = out["ai_usage"]
+
+    assert openai_row["cost_usd"] == "0.12500000"
+    assert openai_row["cost_breakdown"]["total"] == 0.125
+    # 1000 units x 0.0001234567891 + 1.5 h x 0.000000015 = 0.1234568116
+    assert gemini_row["cost_usd"] == "0.12345681"
+    assert gemini_row["cost_breakdown"]["total"] == 0.1234568116
+
+    # the batched path (long lists) prices the same way
+    many = cc.estimate_cost(
+        {"ai_usage": [dict(row, model="gpt-tiny") for _ in range(cc.BATCH_MIN_ROWS)]},
+        pricing_path=path,
+        alert_unknown_models=False,
+    )
+    assert {u["cost_usd"] for u in many["ai_usage"]} == {"0.12500000"}
+
+
+def test_breakdown_does_not_share_cached_pricing(write_pricing):
+    path = write_pricing({
+        "google": {
+            "billing_unit_tokens": 1_000_000,
+            "models": {
+                "gemini-x": {
+                    "tiers": [{"max_input_tokens": None, "input": 1.25, "output": 10,
+                               "context_cache": 0.3, "storage_per_hour": 4.5}]
+                }
+            },
+        },
+    })
+    row = {"model": "gemini-x", "status": "success", "input_tokens": 1000, "output_tokens": 10, "cost_usd": None}
+
+    out = cc.estimate_cost({"ai_usage": dict(row)}, pricing_path=path, alert_unknown_models=False, return_breakdown=True)
+    breakdown = out["ai_usage"]["cost_breakdown"]
+    breakdown["meta"]["tier"]["input"] = 999
+    breakdown["pricing"]["input"] = 999
+
+    again = cc.estimate_cost({"ai_usage": dict(row)}, pricing_path=path, alert_unknown_models=False, return_breakdown=True)
+    assert again["ai_usage"]["cost_breakdown"]["meta"]["tier"]["input"] == 1.25
+    assert again["ai_usage"]["cost_breakdown"]["pricing"]["input"] == 1.25
+    assert again["ai_usage"]["cost_usd"] == out["ai_usage"]["cost_usd"]
+
+
+def test_relative_spellings_of_a_path_share_one_parsed_pricing(write_pricing, monkeypatch):
+    path = write_pricing({"openai": {"billing_unit_tokens": 1_000_000, "models": {}}}, name="p.json")
+    monkeypatch.chdir(os.path.dirname(path))
+
+    assert pricing_loader.get_pricing("p.json") is pricing_loader.get_pricing("./p.json")
+    assert pricing_loader.get_pricing("p.json") is pricing_loader.get_pricing(path)
+
+
+def test_string_payload_keeps_nan_and_infinity(pricing_path):
+    # loads() accepts NaN/Infinity (stdlib fallback); dumps() must write them back, not null
+    payload = (
+        '{"ai_usage": {"model": "gpt-5-mini", "status": "success", "input_tokens": 1000,'
+        ' "output_tokens": 10, "cost_usd": null, "latency_ms": NaN, "t": Infinity}}'
+    )
+
+    out = cc.estimate_cost(payload, pricing_path=pricing_path, alert_unknown_models=False)
+    usage = json.loads(out)["ai_usage"]
+
+    assert usage["cost_usd"] == "0.00027000"
+    assert usage["latency_ms"] != usage["latency_ms"]  # NaN
+    assert usage["t"] == float("inf")
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        '{"model": "gpt-5-mini", "status": "success", "input_tokens": 5, "cost_usd": "0.1"}',
+        '{"model": "unknown-model", "status": "success", "input_tokens": 5, "cost_usd": null}',
+    ],
+)
+def test_string_payload_returned_unchanged_when_nothing_priced(record, pricing_path):
+    payload = '{"ai_usage": [' + record + ',  ' + record + ']}'
+
+    out = cc.estimate_cost(payload, pricing_path=pricing_path, alert_unknown_models=False)
+
+    assert out is payload
+
+
+def test_string_payload_reserialized_when_a_row_is_priced(pricing_path):
+    payload = (
+        '{"ai_usage": [{"model": "gpt-5-mini", "status": "success", "input_tokens": 5, "cost_usd": "0.1"},'
+        '  {"model": "gpt-5-mini", "status": "success", "input_tokens": 5, "cost_usd": null}]}'
+    )
+
+    out = cc.estimate_cost(payload, pricing_path=pricing_path, alert_unknown_models=False)
+
+    assert out != payload
+    assert [u["cost_usd"] for u in json.loads(out)["ai_usage"]] == ["0.1", "0.00000125"]
+
+
+@pytest.mark.parametrize(
+    "limits",
+    [
+        [200000, None],
+        [300000, 200000, None],
+        [None, 200000],
+        [200000, 200000, None],
+        [100, 300000, 200000],
+    ],
+)
+def test_gemini_tier_matches_select_tier(limits):
+    # distinct prices per tier, in file order (select_tier is first-match)
+    tiers = [
+        {"max_input_tokens": mx, "input": 1.0 + k, "output": 10.0 + k,
+         "context_cache": 0.1 * (k + 1), "storage_per_hour": 4.5}
+        for k, mx in enumerate(limits)
+    ]
+    pricing = {"google": {"billing_unit_tokens": 1_000_000, "models": {"gemini-x": {"tiers": tiers}}}}
+
+    for n in sorted({0, 10_000_000} | {n + d for n in limits if n is not None for d in (-1, 0, 1)}):
+        out = cc.estimate_gemini_cost(pricing, "gemini-x", {"model": "gemini-x", "input_tokens": n, "output_tokens": 7})
+        assert out["meta"]["tier"] == cc.select_tier(tiers, n)
+
+
+def test_get_usage_fields_storage_hours_is_decimal():
+    fields = cc.get_usage_fields({"model": "gemini-2.5-pro", "storage_hours": "1.5"})
+    assert fields["storage_hours"] == Decimal("1.5")
+    assert isinstance(fields["storage_hours"], Decimal)